@@ -18,6 +18,7 @@
 from opv_directorymanagerclient.exception import OPVDMCException
 from opv_directorymanagerclient.protocol import Protocol
 from opv_directorymanagerclient.directoryuuid import *
+from opv_directorymanagerclient.protocolselector import ProtocolSelector
 from opv_directorymanagerclient.directorymanagerclient import DirectoryManagerClient, Protocol
 
 __version__ = "0.0.1"
@@ -5,14 +5,14 @@ Usage:
 
 Options:
     -h --help                Show help.
-    --protocol=<protocol>    The protocol to open files, in FTP, local. [default: FTP]
+    --protocol=<protocol>    The protocol to open files, in FTP, file, auto. [default: FTP]
     --dir-manager=<str>      API for directory manager [default: http://localhost:5001]
 """
 
 import docopt
 from opv_directorymanagerclient import DirectoryManagerClient, Protocol
 
-protocols = {proto.name.lower(): proto.value for proto in Protocol}
+protocols = {proto.name.lower(): proto for proto in Protocol}
 
 def main():
     args = docopt.docopt(__doc__)
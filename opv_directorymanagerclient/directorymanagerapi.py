@@ -0,0 +1,52 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD
+# Email: benjamin.bernard@openpathview.fr
+
+import logging
+import requests
+
+from opv_directorymanagerclient import OPVDMCException
+from opv_directorymanagerclient import Protocol
+
+
+def generate_uuid(api_base: str):
+    """
+    Generate a directory UUID.
+    :param api_base: Api base URL.
+    """
+    logging.debug("generate_uuid")
+    rep = requests.post(api_base + "/v1/directory")
+
+    if rep.status_code != 200:
+        raise OPVDMCException("Can't generate UUID", rep)
+
+    return rep.json()
+
+
+def fetch_uri(api_base: str, uuid: str, protocol: Protocol):
+    """
+    Get a directory URI (with protocol).
+    :param api_base: Api base URL.
+    :param uuid: Directory uuid.
+    :param protocol: Wanted protocol URI.
+    """
+    logging.debug("fetch_uri")
+    rep = requests.get(api_base + "/v1/directory/" + uuid + "/" + protocol.value)
+
+    if rep.status_code != 200:
+        raise OPVDMCException("Can't fetch URI", rep)
+
+    return rep.json()
@@ -22,17 +22,21 @@ from tempfile import TemporaryDirectory
 from opv_directorymanagerclient import OPVDMCException
 from opv_directorymanagerclient import Protocol
 from opv_directorymanagerclient import DirectoryUuidFtp, DirectoryUuidFile
+from opv_directorymanagerclient import ProtocolSelector
+from opv_directorymanagerclient.directorymanagerapi import generate_uuid
 
 class DirectoryManagerClient:
     """
     OPV Directory Manager Client
     """
 
-    def __init__(self, api_base=None, default_protocol=Protocol.FTP, workspace_directory=None):
+    def __init__(self, api_base=None, default_protocol=Protocol.FTP, workspace_directory=None, protocol_cache_file=None):
         """
         :param api_base: Base URL for the storage API.
         :param default_protocol: Default protocol, if not specified FTP is choosen if available.
+                                 Protocol.AUTO select the fastest protocol from this node at each Open.
         :param workspace_directory: Directory were files will be temporary stored, default is a directory in /tmp, prefixed by 'OPVDirManClient'
+        :param protocol_cache_file: File used to cache protocol probes with Protocol.AUTO, see ProtocolSelector.
         """
         self.__api_base = api_base
         self.__available_protocols = self.__fetch_protocols()
@@ -43,7 +47,12 @@ class DirectoryManagerClient:
         if len(self.__available_protocols) == 0:
             raise OPVDMCException("No supported protocols on server.")
 
-        self.__default_protocol = default_protocol if default_protocol in self.__available_protocols else self.__available_protocols[0]
+        self.__protocol_selector = None
+        if default_protocol == Protocol.AUTO:
+            self.__default_protocol = Protocol.AUTO
+            self.__protocol_selector = ProtocolSelector(api_base=self.__api_base, protocols=self.__available_protocols, cache_file=protocol_cache_file)
+        else:
+            self.__default_protocol = default_protocol if default_protocol in self.__available_protocols else self.__available_protocols[0]
         logging.debug("Selected protocol : " + str(self.__default_protocol))
 
     def __str2Protocol(self, str):
@@ -64,20 +73,51 @@ class DirectoryManagerClient:
         if r.status_code != 200:
             raise OPVDMCException("Unable to get supported protocols (got HTTP status " + str(r.status_code))
 
-        return list(filter(None.__ne__, map(self.__str2Protocol, r.json())))
+        return [p for p in map(self.__str2Protocol, r.json()) if p is not None and p != Protocol.AUTO]
 
-    def Open(self, uuid=None, autosave=True):
+    def Open(self, uuid=None, autosave=True, mode="w"):
         """
         Get a directory form it's uuid or create one.
         :param uuid: Optional directory's uuid.
         :param autosave: Save back to the server at ext/close (default: True).
+        :param mode: "w" to work on a local copy (default), "r" to read files directly from the storage
+                     (local_directory is the storage path with FILE protocol, use open_file with FTP).
         """
-        if self.__default_protocol == Protocol.FTP:
-            return DirectoryUuidFtp(uuid=uuid, api_base=self.__api_base, workspace_directory=self.__workspace_directory, autosave=autosave)
-        if self.__default_protocol == Protocol.FILE:
-            return DirectoryUuidFile(uuid=uuid, api_base=self.__api_base, workspace_directory=self.__workspace_directory, autosave=autosave)
+        protocol = self.__default_protocol
+        created = False
+        if protocol == Protocol.AUTO:
+            if uuid is None and mode == "r":
+                raise OPVDMCException("An uuid is needed to open a directory in read only mode")
+            if uuid is None:  # probes needs the directory URIs
+                uuid = generate_uuid(self.__api_base)
+                created = True
+            try:
+                protocol = self.__protocol_selector.select(uuid, mode=mode)
+            except Exception as e:
+                if not created:
+                    raise
+                raise OPVDMCException("Directory " + uuid + " was created but can't be opened : " + str(e)) from e
+
+        if protocol == Protocol.FTP:
+            return DirectoryUuidFtp(uuid=uuid, api_base=self.__api_base, workspace_directory=self.__workspace_directory, autosave=autosave, mode=mode, created=created)
+        if protocol == Protocol.FILE:
+            return DirectoryUuidFile(uuid=uuid, api_base=self.__api_base, workspace_directory=self.__workspace_directory, autosave=autosave, mode=mode, created=created)
         raise NotImplemented
 
+    def Clone(self, src_uuid):
+        """
+        Create a new directory with the content of an existing one.
+        Files are copied directly on the storage side, without local copy.
+        :param src_uuid: Uuid of the directory to clone.
+        :return: The new directory's uuid.
+        """
+        directory = self.Open(autosave=False)
+        try:
+            directory.clone_from(src_uuid)
+        finally:
+            directory.close()
+        return directory.uuid
+
     @property
     def available_protocols(self):
         return self.__available_protocols
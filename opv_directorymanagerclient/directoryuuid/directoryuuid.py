@@ -17,12 +17,12 @@
 import os
 import shutil
 import logging
-import requests
 from path import Path
 
 from tempfile import mkdtemp
 from opv_directorymanagerclient import Protocol
 from opv_directorymanagerclient import OPVDMCException
+from opv_directorymanagerclient.directorymanagerapi import generate_uuid, fetch_uri
 from opv_directorymanagerclient.directoryuuid import SyncableDirectory
 
 class DirectoryUuid():
@@ -31,51 +31,60 @@ class DirectoryUuid():
     implement a ContextManager that return a (uuid, local path).
     """
 
-    def __init__(self, workspace_directory, api_base: str, uuid=None, autosave=True):
+    def __init__(self, workspace_directory, api_base: str, uuid=None, autosave=True, mode="w", created=False):
         """
         :param uuid: Directory UUID.
         :param api_base: Api base URL.
         :param work_directory: Local directory used to store file. If you use local protocol you may use
                                a folder on the same partition so that cp will be hard link.
         :param autosave: Save changed data on the server at exit or context manager close (Default: True).
-        """
+        :param mode: "w" to work on a local copy of the files (Default), "r" to read files directly
+                     from the storage without local copy, save is disabled in this mode.
+        :param created: True if uuid was just generated, it's empty so there is nothing to pull (Default: False).
+        """
+        if mode not in ("r", "w"):
+            raise OPVDMCException("Unknown mode '" + str(mode) + "', mode could be 'r' or 'w'")
+        if mode == "r" and uuid is None:
+            raise OPVDMCException("An uuid is needed to open a directory in read only mode")
+
         self.__api_base = api_base
         self.__workspace_directory = workspace_directory
         self._uuid = uuid if uuid is not None else self.__generate_uuid()
+        self._mode = mode
         self._syncable_local = None
         self._syncable_remote = None  # User need to define it in their implementation
+        self.__local_directory = None
+
+        if mode == "r":
+            self._autosave = False
+            self._ensure_remote_connexion()
+            self.__local_directory = self._direct_local_directory()
+            return
+
         self.__create_local_directory()
         self._autosave = autosave
 
         # Fetching files for existing uuids
-        if uuid is not None:
+        if uuid is not None and not created:
             self._pull_files()
 
     def __generate_uuid(self):
         """
         Generate a directory UUID.
         """
-        logging.debug("__generate_uuid")
-        rep = requests.post(self.__api_base + "/v1/directory")
-
-        if rep.status_code != 200:
-            raise OPVDMCException("Can't generate UUID", rep)
-
-        self._uuid = rep.json()
+        self._uuid = generate_uuid(self.__api_base)
         return self._uuid
 
-    def _fetch_uri(self, protocol: Protocol):
+    def _fetch_uri(self, protocol: Protocol, uuid=None):
         """
         Get a directory URI (with protocol).
         :param protocol: Wanted protocol URI.
+        :param uuid: Optional directory uuid, if not specified the URI of this directory is fetched.
         """
-        logging.debug("_fetch_uri")
-        rep = requests.get(self.__api_base + "/v1/directory/" + self._uuid + "/" + protocol.value)
-
-        if rep.status_code != 200:
-            raise OPVDMCException("Can't generate UUID", rep)
+        if uuid is not None:
+            return fetch_uri(self.__api_base, uuid, protocol)
 
-        self._uri = rep.json()
+        self._uri = fetch_uri(self.__api_base, self._uuid, protocol)
         return self._uri
 
     def __create_local_directory(self):
@@ -90,7 +99,9 @@ class DirectoryUuid():
         """
         Remove directory associated to uuid directory.
         """
-        if Path(self.__local_directory).isdir():
+        if self._mode == "r":  # local_directory is the storage directory, or None
+            return
+        if self.__local_directory is not None and Path(self.__local_directory).isdir():
             shutil.rmtree(self.__local_directory)
 
     def _ensure_remote_connexion(self):
@@ -99,6 +110,14 @@ class DirectoryUuid():
         """
         raise NotImplemented()
 
+    def _rel_walk(self, syncable: SyncableDirectory):
+        """
+        Walk over a directory for a sync, see SyncableDirectory.rel_walk.
+        Override it to deal with remote errors.
+        :param syncable: SyncableDirectory to walk over.
+        """
+        return syncable.rel_walk()
+
     def __sync(self, src: SyncableDirectory, dest: SyncableDirectory, cp_file_method):
         """
         Sync 2 folders.
@@ -108,7 +127,7 @@ class DirectoryUuid():
                                This function takes (rel_path, srcSyncFolder, desSyncFolder).
         """
 
-        for (src_path, dir_names, file_names) in src.rel_walk():
+        for (src_path, dir_names, file_names) in self._rel_walk(src):
             logging.debug("__sync: src_path=" + src_path)
 
             # creating directories
@@ -139,6 +158,31 @@ class DirectoryUuid():
         """
         raise NotImplemented()
 
+    def _cp_file_clone_method(self, rel_path: str, src: SyncableDirectory, dest: SyncableDirectory):
+        """
+        Method used to cp files from an other remote directory to this remote directory (storage side copy).
+        Needs to be defined in user implementation.*
+        :param rel_path: Relative path to directoryuuid root of file we want to copy.
+        :param src: Source directory (should be an other uuid remote directory).
+        :param dest: Destination directory (should be remote).
+        """
+        raise NotImplemented()
+
+    def _open_remote(self, uuid):
+        """
+        Return a SyncableDirectory for the remote directory of an other uuid.
+        Needs to be defined in user implementation.*
+        :param uuid: Directory uuid.
+        """
+        raise NotImplemented()
+
+    def _close_remote(self, syncable: SyncableDirectory):
+        """
+        Release what was used by a SyncableDirectory returned by _open_remote.
+        :param syncable: SyncableDirectory returned by _open_remote.
+        """
+        pass
+
     def _pull_files(self):
         """
         Import and copy existing data to local_directory
@@ -153,10 +197,44 @@ class DirectoryUuid():
         self._ensure_remote_connexion()
         self.__sync(self._syncable_local, self._syncable_remote, self._cp_file_push_method)
 
+    def clone_from(self, src_uuid):
+        """
+        Copy files of an other directory uuid in this directory directly on the storage side,
+        files aren't transfered to local_directory.
+        :param src_uuid: Uuid of the directory to copy.
+        """
+        self._ensure_remote_connexion()
+        src = self._open_remote(src_uuid)
+        try:
+            self.__sync(src, self._syncable_remote, self._cp_file_clone_method)
+        finally:
+            self._close_remote(src)
+
+    def _open_remote_file(self, rel_path: str):
+        """
+        Open a remote file for binary reading, without local copy.
+        Needs to be defined in user implementation.*
+        :param rel_path: Relative path to directoryuuid root of file we want to read.
+        """
+        raise NotImplemented()
+
+    def open_file(self, rel_path: str):
+        """
+        Open a file of the directory for binary reading.
+        In read only mode the file is read directly from the storage.
+        :param rel_path: Relative path to directoryuuid root of file we want to read.
+        """
+        if self._mode == "r":
+            self._ensure_remote_connexion()
+            return self._open_remote_file(rel_path)
+        return open(self._syncable_local.get_full_path(rel_path), 'rb')
+
     def save(self):
         """
         Save files back to server
         """
+        if self._mode == "r":
+            raise OPVDMCException("Directory " + str(self._uuid) + " is opened in read only mode, it can't be saved")
         self._push_files()
 
     def close(self):
@@ -166,13 +244,28 @@ class DirectoryUuid():
         """
         self.__delete_local_directory()
 
+    def _direct_local_directory(self):
+        """
+        Return the storage directory as a local path, None if the protocol has no local access.
+        Used as local_directory in read only mode, called once when the directory is opened.
+        """
+        return None
+
     @property
     def local_directory(self):
         """
          Return the directory where files are stored locally.
+         In read only mode, it's the storage directory if it's locally accessible, it must not be modified.
         """
         return self.__local_directory
 
+    @property
+    def mode(self):
+        """
+        Return opening mode, "r" or "w".
+        """
+        return self._mode
+
     @property
     def uuid(self):
         """
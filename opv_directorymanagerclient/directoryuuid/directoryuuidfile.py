@@ -23,6 +23,14 @@ from urllib.parse import urlparse
 
 from opv_directorymanagerclient.directoryuuid import DirectoryUuid, SyncableDirectory
 from opv_directorymanagerclient import Protocol
+from opv_directorymanagerclient import OPVDMCException
+
+try:
+    import fcntl
+except ImportError:  # not available on this platform, reflink won't be used
+    fcntl = None
+
+FICLONE = 0x40049409  # ioctl request from linux/fs.h, clone a file (reflink)
 
 class DirectoryUuidFile(DirectoryUuid):
     """
@@ -31,6 +39,7 @@ class DirectoryUuidFile(DirectoryUuid):
 
     def __init__(self, *args, **kwargs):
         self.__can_hard_link = None
+        self.__can_reflink = fcntl is not None
 
         DirectoryUuid.__init__(self, *args, **kwargs)
 
@@ -68,6 +77,29 @@ class DirectoryUuidFile(DirectoryUuid):
             logging.debug('DirectoryUuidFile._cp_or_link : copying ' + src + ' -> ' + dest)
             copyfile(src, dest)
 
+    def _reflink(self, src: str, dest: str):
+        """
+        Reflink (copy on write clone) src to dest if the file system supports it.
+        Also save the state to prevent retry.
+        :param src: source path.
+        :param dest: dest path.
+        :return: True if dest was reflinked.
+        """
+        if not self.__can_reflink:
+            return False
+
+        try:
+            with open(src, 'rb') as f_src, open(dest, 'wb') as f_dest:
+                fcntl.ioctl(f_dest.fileno(), FICLONE, f_src.fileno())
+        except OSError:
+            self.__can_reflink = False
+            if os.path.exists(dest):
+                os.unlink(dest)
+            return False
+
+        logging.debug('DirectoryUuidFile._reflink : reflinked ' + src + ' -> ' + dest)
+        return True
+
     def _ensure_remote_connexion(self):
         """
         No remote connexion to ensure.
@@ -76,6 +108,39 @@ class DirectoryUuidFile(DirectoryUuid):
             parsed_uri = urlparse(self._fetch_uri(protocol=Protocol.FILE))
             self._syncable_remote = SyncableDirectory(parsed_uri.path, os)
 
+    def _open_remote(self, uuid):
+        """
+        Return a SyncableDirectory on an other directory uuid.
+        :param uuid: Directory uuid.
+        """
+        parsed_uri = urlparse(self._fetch_uri(protocol=Protocol.FILE, uuid=uuid))
+        return SyncableDirectory(self._check_readable(parsed_uri.path, uuid), os)
+
+    def _check_readable(self, path: str, uuid: str):
+        """
+        Raise OPVDMCException if a storage directory isn't a readable directory on this node.
+        :param path: Storage directory path.
+        :param uuid: Directory uuid, for the error message.
+        :return: path.
+        """
+        if not os.path.isdir(path) or not os.access(path, os.R_OK | os.X_OK):
+            raise OPVDMCException("Storage directory '" + path + "' of " + str(uuid) + " isn't readable from this node")
+        return path
+
+    def _direct_local_directory(self):
+        """
+        Storage directory, it has to be mounted on this node.
+        """
+        self._ensure_remote_connexion()
+        return self._check_readable(self._syncable_remote.get_full_path(), self._uuid)
+
+    def _open_remote_file(self, rel_path: str):
+        """
+        Open a storage file for binary reading.
+        :param rel_path: Relative path to directoryuuid root.
+        """
+        return open(self._syncable_remote.get_full_path(rel_path), 'rb')
+
     def _is_newer(self, src: str, dest: str):
         """
         Return true if src is newer than dest.
@@ -113,3 +178,19 @@ class DirectoryUuidFile(DirectoryUuid):
         :param dest: destination directory (should be local directory).
         """
         self._cp_file_push_method(rel_path, src, dest)
+
+    def _cp_file_clone_method(self, rel_path: str, src: SyncableDirectory, dest: SyncableDirectory):
+        """
+        Reflink or copy a file from an other directory uuid.
+        Files are never hardlinked so that the clone can be modified without changing the source directory.
+        :param rel_path: Relative path to directoryuuid root.
+        :param src: source directory (should be an other remote directory).
+        :param dest: destination directory (should be remote directory).
+        """
+        src_path = src.get_full_path(rel_path)
+        dest_path = dest.get_full_path(rel_path)
+        if self._reflink(src_path, dest_path):
+            return
+
+        logging.debug('DirectoryUuidFile._cp_file_clone_method : copying ' + src_path + ' -> ' + dest_path)
+        copyfile(src_path, dest_path)
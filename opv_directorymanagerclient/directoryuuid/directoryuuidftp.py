@@ -17,7 +17,11 @@
 
 import logging
 import ftplib
+import shutil
+import threading
+import time
 import ftputil
+import ftputil.error
 from urllib.parse import urlparse
 
 from opv_directorymanagerclient.directoryuuid import DirectoryUuid, SyncableDirectory
@@ -26,13 +30,27 @@ from opv_directorymanagerclient import Protocol
 # https://docs.python.org/3/library/urllib.parse.html
 # https://gist.github.com/slok/1447559
 
+# errors meaning the FTP connexion is lost
+CONNEXION_ERRORS = (ftputil.error.FTPOSError, ftputil.error.FTPIOError, EOFError)
+
+
+def _raise_walk_error(error):
+    """
+    onerror for FTPHost.walk, which silently skips directories that can't be listed by default.
+    """
+    raise error
+
+
 class FTPAnonSessionWithPort(ftplib.FTP):
     """
     Factory for FTPutil, to be able to deal with anonymous FTP and different port.
     """
 
-    def __init__(self, host, userid, password, port):
-        ftplib.FTP.__init__(self)
+    def __init__(self, host, userid, password, port, timeout=None):
+        if timeout is not None:
+            ftplib.FTP.__init__(self, timeout=timeout)
+        else:
+            ftplib.FTP.__init__(self)
         self.connect(host, port)
         if userid is not None and password is not None:
             self.login(userid, password)
@@ -42,23 +60,182 @@ class FTPAnonSessionWithPort(ftplib.FTP):
 
 class DirectoryUuidFtp(DirectoryUuid):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, keepalive_interval=60, max_reconnections=3, reconnection_delay=2, **kwargs):
+        """
+        :param keepalive_interval: Seconds between two NOOP sent to keep the FTP connexion alive while idle (Default: 60).
+        :param max_reconnections: Maximum number of reconnections during a sync before giving up (Default: 3).
+        :param reconnection_delay: Seconds to wait before reconnecting, multiplied by the reconnection number (Default: 2).
+        Other parameters are DirectoryUuid ones.
+        """
         self.__ftp_host = None
-        DirectoryUuid.__init__(self, *args, **kwargs)
+        self.__parsed_uri = None
+        self.__copy_session = None
+        self.__can_site_copy = None
+        self.__keepalive_interval = keepalive_interval
+        self.__max_reconnections = max_reconnections
+        self.__reconnection_delay = reconnection_delay
+        self.__reconnections = 0
+        self.__failed_paths = set()  # files whose transfer failed, they are sent again without "if newer" check
+        self.__ftp_lock = threading.RLock()  # ftputil isn't thread safe, keepalive and transfers musn't overlap
+        self.__keepalive_stop = threading.Event()
+        self.__keepalive_thread = None
+        self.__initialized = False
+        try:
+            DirectoryUuid.__init__(self, *args, **kwargs)
+        except:
+            if self.__ftp_host is not None:
+                self.__ftp_host.close()
+            raise
 
-    def __connectFtp(self, uri: str):
+        # keepalive starts once the object is returned, so that it is always stopped by close
+        self.__initialized = True
+        if self.__ftp_host is not None:
+            self.__start_keepalive()
+
+    def __make_ftp_host(self, parsed_uri):
         """
-        Initiate self.ftp, connect to FTP server if not already connected.
+        Return a new FTPHost connected to the server of parsed_uri.
+        :param parsed_uri: Parsed FTP URI.
         """
-        parsed_uri = urlparse(uri)
-        self.__ftp_host = ftputil.FTPHost(
+        ftp_host = ftputil.FTPHost(
             parsed_uri.hostname,
             parsed_uri.username,
             parsed_uri.password,
             port=parsed_uri.port,
             session_factory=FTPAnonSessionWithPort)
-        self.__ftp_host.chdir(parsed_uri.path)
-        self._syncable_remote = SyncableDirectory(parsed_uri.path, self.__ftp_host)
+        ftp_host.chdir(parsed_uri.path)
+        return ftp_host
+
+    def __connectFtp(self, uri: str):
+        """
+        Initiate self.ftp, connect to FTP server if not already connected.
+        """
+        self.__parsed_uri = urlparse(uri)
+        self.__ftp_host = self.__make_ftp_host(self.__parsed_uri)
+        self._syncable_remote = SyncableDirectory(self.__parsed_uri.path, self.__ftp_host)
+        if self.__initialized:
+            self.__start_keepalive()
+
+    def __start_keepalive(self):
+        """
+        Start the background thread sending NOOP on the FTP connexion.
+        """
+        if self.__keepalive_thread is not None or not self.__keepalive_interval:
+            return
+
+        self.__keepalive_thread = threading.Thread(target=self.__keepalive_loop, daemon=True)
+        self.__keepalive_thread.start()
+
+    def __keepalive_loop(self):
+        """
+        Send a NOOP every keepalive_interval seconds, skipped while a transfer is using the connexion.
+        """
+        while not self.__keepalive_stop.wait(self.__keepalive_interval):
+            if not self.__ftp_lock.acquire(blocking=False):
+                continue
+            try:
+                logging.debug("DirectoryUuidFtp.__keepalive_loop: NOOP")
+                self.__ftp_host.keep_alive()
+            except ftputil.error.FTPError as e:
+                logging.warning("DirectoryUuidFtp.__keepalive_loop: keepalive failed, will reconnect on next transfer : " + str(e))
+            finally:
+                self.__ftp_lock.release()
+
+    def __reconnect(self, error):
+        """
+        Replace the FTP connexion by a new one, failed connexions attempts are retried.
+        Reconnections are bounded by max_reconnections for a whole sync.
+        :param error: Error raised if the connexion can't be made again.
+        """
+        while True:
+            if self.__reconnections >= self.__max_reconnections:
+                raise error
+
+            self.__reconnections += 1
+            logging.warning("DirectoryUuidFtp.__reconnect: reconnecting to FTP server (" + str(self.__reconnections) + "/" + str(self.__max_reconnections) + ")")
+            try:
+                self.__ftp_host.close()
+            except (ftputil.error.FTPError, OSError, EOFError):
+                pass  # connexion is already lost
+
+            time.sleep(self.__reconnection_delay * self.__reconnections)
+            try:
+                self.__ftp_host = self.__make_ftp_host(self.__parsed_uri)
+            except ftputil.error.PermanentError:
+                raise
+            except CONNEXION_ERRORS as e:
+                logging.warning("DirectoryUuidFtp.__reconnect: unable to reconnect : " + str(e))
+                error = e
+                continue
+
+            self._syncable_remote.os_utils = self.__ftp_host
+            return
+
+    def __with_reconnect(self, method, retry_method=None, failed_path=None):
+        """
+        Call method, reconnect and call it again if the FTP connexion was lost.
+        :param method: Function using self.__ftp_host (always resolve it at call time).
+        :param retry_method: Optional, function called instead of method after a reconnection,
+                             or directly if failed_path already failed (in a previous sync).
+        :param failed_path: Optional, path remembered as failed until method or retry_method succeeds.
+        """
+        if retry_method is not None and failed_path in self.__failed_paths:
+            method = retry_method
+
+        while True:
+            with self.__ftp_lock:
+                try:
+                    result = method()
+                    self.__failed_paths.discard(failed_path)
+                    return result
+                except ftputil.error.PermanentError:
+                    if failed_path is not None:
+                        self.__failed_paths.add(failed_path)
+                    raise
+                except CONNEXION_ERRORS as e:
+                    if failed_path is not None:
+                        self.__failed_paths.add(failed_path)
+                    logging.warning("DirectoryUuidFtp.__with_reconnect: FTP error : " + str(e))
+                    self.__reconnect(e)
+                    if retry_method is not None:
+                        method = retry_method
+
+    def _rel_walk(self, syncable: SyncableDirectory):
+        """
+        Walk over a FTP directory, listing errors are raised instead of skipping directories.
+        The whole tree of this directory is listed before the sync, again on the new connexion after a reconnection,
+        so that reconnections during transfers don't affect the walk.
+        :param syncable: SyncableDirectory to walk over.
+        """
+        if syncable is self._syncable_local:
+            return syncable.rel_walk()
+        if syncable is not self._syncable_remote:  # an other directory with it's own connexion (clone)
+            return syncable.rel_walk(onerror=_raise_walk_error)
+        return self.__with_reconnect(lambda: list(syncable.rel_walk(onerror=_raise_walk_error)))
+
+    def _pull_files(self):
+        """
+        Download files, reconnect and resume if the connexion is lost.
+        A file which failed is downloaded again, even if the sync has to be restarted.
+        """
+        self.__reconnections = 0
+        self.__with_reconnect(lambda: DirectoryUuid._pull_files(self))
+
+    def _push_files(self):
+        """
+        Upload files, reconnect and resume if the connexion is lost.
+        A file which failed is uploaded again, even if the sync has to be restarted.
+        """
+        self.__reconnections = 0
+        self.__with_reconnect(lambda: DirectoryUuid._push_files(self))
+
+    def clone_from(self, src_uuid):
+        """
+        Copy files of an other directory uuid, see DirectoryUuid.clone_from.
+        Keepalive is suspended during the copy.
+        """
+        with self.__ftp_lock:
+            DirectoryUuid.clone_from(self, src_uuid)
 
     def _ensure_remote_connexion(self):
         """
@@ -75,7 +252,11 @@ class DirectoryUuidFtp(DirectoryUuid):
         :param des: destination directory (should be FTP directory).
         """
         logging.debug("__local_to_ftp_cp_file: " + str(src.get_full_path(rel_path)) + " -> " + str(dest.get_full_path(rel_path)))
-        self.__ftp_host.upload_if_newer(src.get_full_path(rel_path), dest.get_full_path(rel_path))
+        # a partially uploaded file is newer than the source, so it has to be uploaded again unconditionally
+        self.__with_reconnect(
+            lambda: self.__ftp_host.upload_if_newer(src.get_full_path(rel_path), dest.get_full_path(rel_path)),
+            retry_method=lambda: self.__ftp_host.upload(src.get_full_path(rel_path), dest.get_full_path(rel_path)),
+            failed_path=dest.get_full_path(rel_path))
 
     def _cp_file_pull_method(self, rel_path, src, dest):
         """
@@ -85,17 +266,112 @@ class DirectoryUuidFtp(DirectoryUuid):
         :param des: destination directory (should be local directory).
         """
         logging.debug("__ftp_to_local_cp_file: " + str(src.get_full_path(rel_path)) + " -> " + str(dest.get_full_path(rel_path)))
-        self.__ftp_host.download_if_newer(src.get_full_path(rel_path), dest.get_full_path(rel_path))
+        # a partially downloaded file is newer than the source, so it has to be downloaded again unconditionally
+        self.__with_reconnect(
+            lambda: self.__ftp_host.download_if_newer(src.get_full_path(rel_path), dest.get_full_path(rel_path)),
+            retry_method=lambda: self.__ftp_host.download(src.get_full_path(rel_path), dest.get_full_path(rel_path)),
+            failed_path=dest.get_full_path(rel_path))
+
+    def _open_remote(self, uuid):
+        """
+        Return a SyncableDirectory on an other directory uuid, using it's own FTP connexion.
+        Server side copy (SITE CPFR/CPTO) is only tried if both directories are on the same server.
+        :param uuid: Directory uuid.
+        """
+        parsed_uri = urlparse(self._fetch_uri(protocol=Protocol.FTP, uuid=uuid))
+        src_host = self.__make_ftp_host(parsed_uri)
+        same_server = (parsed_uri.hostname, parsed_uri.port, parsed_uri.username) == \
+            (self.__parsed_uri.hostname, self.__parsed_uri.port, self.__parsed_uri.username)
+        if not same_server:
+            self.__can_site_copy = False
+        elif self.__can_site_copy is not False:
+            try:
+                self.__copy_session = FTPAnonSessionWithPort(
+                    self.__parsed_uri.hostname, self.__parsed_uri.username, self.__parsed_uri.password, self.__parsed_uri.port)
+            except:
+                src_host.close()
+                raise
+
+        return SyncableDirectory(parsed_uri.path, src_host)
+
+    def _close_remote(self, syncable: SyncableDirectory):
+        """
+        Close FTP connexions opened by _open_remote.
+        :param syncable: SyncableDirectory returned by _open_remote.
+        """
+        with self.__ftp_lock:
+            syncable.os_utils.close()
+            if self.__copy_session is not None:
+                self.__copy_session.close()
+                self.__copy_session = None
+
+    def _site_copy(self, src_path: str, dest_path: str):
+        """
+        Copy a file on the FTP server with SITE CPFR/CPTO (ProFTPD mod_copy) if the server supports it.
+        Also save the state to prevent retry.
+        :param src_path: Full FTP source path.
+        :param dest_path: Full FTP destination path.
+        :return: True if the file was copied by the server.
+        """
+        if self.__can_site_copy is False or self.__copy_session is None:
+            return False
+
+        try:
+            self.__copy_session.sendcmd("SITE CPFR " + src_path)
+            self.__copy_session.sendcmd("SITE CPTO " + dest_path)
+        except ftplib.Error as e:
+            logging.debug("DirectoryUuidFtp._site_copy: server side copy not available : " + str(e))
+            self.__can_site_copy = False
+            return False
+
+        self.__can_site_copy = True
+        return True
+
+    def _cp_file_clone_method(self, rel_path: str, src: SyncableDirectory, dest: SyncableDirectory):
+        """
+        Copy a file from an other directory uuid, with a server side copy or streamed from FTP to FTP.
+        Nothing is written to local disk.
+        :param rel_path: Relative path to directoryuuid root.
+        :param src: source directory (should be an other FTP directory).
+        :param dest: destination directory (should be FTP directory).
+        """
+        src_path = src.get_full_path(rel_path)
+        dest_path = dest.get_full_path(rel_path)
+        if self._site_copy(src_path, dest_path):
+            logging.debug("__ftp_clone_cp_file: server side copy " + str(src_path) + " -> " + str(dest_path))
+            return
+
+        logging.debug("__ftp_clone_cp_file: relay " + str(src_path) + " -> " + str(dest_path))
+        with src.os_utils.open(src_path, 'rb') as f_src, dest.os_utils.open(dest_path, 'wb') as f_dest:
+            shutil.copyfileobj(f_src, f_dest)
+
+    def _open_remote_file(self, rel_path: str):
+        """
+        Open a FTP file for binary reading, content is streamed from the server.
+        :param rel_path: Relative path to directoryuuid root.
+        """
+        with self.__ftp_lock:
+            return self.__ftp_host.open(self._syncable_remote.get_full_path(rel_path), 'rb')
 
     def get_ftp_host(self):
         """
         Return ftp host object.
+        The connexion is shared with the keepalive thread, hold get_ftp_lock() while using it.
         """
         return self.__ftp_host
 
+    def get_ftp_lock(self):
+        """
+        Return the lock protecting the ftp host object from concurrent use (reentrant).
+        """
+        return self.__ftp_lock
+
     def close(self):
         """
         Close FTP connexion.
         """
-        self.__ftp_host.close()
+        self.__keepalive_stop.set()
+        with self.__ftp_lock:
+            if self.__ftp_host is not None:
+                self.__ftp_host.close()
         DirectoryUuid.close(self)
@@ -31,11 +31,12 @@ class SyncableDirectory:
         self.os_utils = os_utils
         self.dir_uuid_path = dir_uuid_path
 
-    def rel_walk(self):
+    def rel_walk(self, onerror=None):
         """
         Act like os.walk, but elements of tuple relative path to dir_uuid_path so that it can be easily used in an other context.
+        :param onerror: Optional, function called with the error when a directory can't be listed (see os.walk).
         """
-        for (dir_full_path, dir_names, files_names) in self.os_utils.walk(self.dir_uuid_path):
+        for (dir_full_path, dir_names, files_names) in self.os_utils.walk(self.dir_uuid_path, onerror=onerror):
             yield (self._get_rel_path(dir_full_path), dir_names, files_names)
 
     def _make_dir(self, rel_path):
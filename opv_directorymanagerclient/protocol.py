@@ -24,3 +24,4 @@ class Protocol(Enum):
     """
     FTP = "ftp"
     FILE = "file"
+    AUTO = "auto"  # Client side only, select the fastest protocol from this node at each Open
@@ -0,0 +1,270 @@
+# coding: utf-8
+
+# Copyright (C) 2017 Open Path View
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Contributors: Benjamin BERNARD
+# Email: benjamin.bernard@openpathview.fr
+
+import os
+import json
+import time
+from uuid import uuid4
+import socket
+import logging
+import ftputil
+import ftputil.error
+from urllib.parse import urlparse
+
+from opv_directorymanagerclient import OPVDMCException
+from opv_directorymanagerclient import Protocol
+from opv_directorymanagerclient.directorymanagerapi import fetch_uri
+from opv_directorymanagerclient.directoryuuid.directoryuuidftp import FTPAnonSessionWithPort
+
+PROBE_FILE_PREFIX = ".opv_dmc_probe-"
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "opv_directorymanagerclient", "protocols.json")
+
+class ProtocolSelector:
+    """
+    Select the fastest protocol to reach a directory uuid from this node.
+    In "w" mode each protocol is probed by writing and reading a small temporary file in the directory,
+    in "r" mode nothing is written : the directory is listed and an existing file is read.
+    Results are cached per node, storage location (FILE mount point or FTP server) and mode.
+    """
+
+    def __init__(self, api_base: str, protocols, cache_file=None, cache_ttl=86400, failure_ttl=60, probe_size=1024 * 1024, probe_timeout=5):
+        """
+        :param api_base: Api base URL.
+        :param protocols: Protocols available on the server.
+        :param cache_file: JSON file used to store probes results, default is ~/.cache/opv_directorymanagerclient/protocols.json.
+        :param cache_ttl: Seconds before probing a storage location again (Default: 1 day).
+        :param failure_ttl: Seconds before probing an unreachable storage location again (Default: 1 minute).
+        :param probe_size: Size in bytes of the probe file (Default: 1MiB).
+        :param probe_timeout: FTP connexion timeout in seconds (Default: 5).
+        """
+        self.__api_base = api_base
+        self.__protocols = protocols
+        self.__cache_file = cache_file if cache_file is not None else DEFAULT_CACHE_FILE
+        self.__cache_ttl = cache_ttl
+        self.__failure_ttl = failure_ttl
+        self.__probe_size = probe_size
+        self.__probe_timeout = probe_timeout
+        self.__node = socket.gethostname()
+        self.__cache = self.__load_cache()
+        self.__cache_changed = False
+        self.__cached_failure_used = False
+        self.__probes = {Protocol.FILE: self._probe_file, Protocol.FTP: self._probe_ftp}
+
+    def __load_cache(self):
+        """
+        Load probes results from cache file.
+        """
+        try:
+            with open(self.__cache_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def __save_cache(self):
+        """
+        Save probes results to cache file, the cache is only an optimisation so errors are ignored.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.__cache_file), exist_ok=True)
+            with open(self.__cache_file, "w") as f:
+                json.dump(self.__cache, f)
+        except OSError as e:
+            logging.warning("ProtocolSelector.__save_cache: unable to write cache '" + self.__cache_file + "' : " + str(e))
+
+    def __cache_key(self, location: str, mode: str):
+        return self.__node + "|" + location + "|" + mode
+
+    def __cached(self, location: str, mode: str, ignore_failures=False):
+        """
+        Return (True, duration) if the probe of a storage location is cached for this node, (False, None) otherwise.
+        duration is None for unreachable locations.
+        :param ignore_failures: Don't use cached unreachable results.
+        """
+        entry = self.__cache.get(self.__cache_key(location, mode))
+        if entry is None or (entry["duration"] is None and ignore_failures):
+            return (False, None)
+
+        ttl = self.__cache_ttl if entry["duration"] is not None else self.__failure_ttl
+        if time.time() - entry["date"] > ttl:
+            return (False, None)
+        if entry["duration"] is None:
+            self.__cached_failure_used = True
+        return (True, entry["duration"])
+
+    def __store(self, location: str, mode: str, duration):
+        """
+        Cache probe duration of a storage location for this node.
+        :param duration: Probe duration in seconds, None if unreachable.
+        :return: duration.
+        """
+        self.__cache[self.__cache_key(location, mode)] = {"date": time.time(), "duration": duration}
+        self.__cache_changed = True
+        return duration
+
+    def _mount_point(self, path: str):
+        """
+        Return the mount point of a local path.
+        """
+        path = os.path.realpath(path)
+        while not os.path.ismount(path):
+            path = os.path.dirname(path)
+        return path
+
+    def _probe_file(self, uri: str, mode: str, ignore_failures=False):
+        """
+        Probe FILE protocol, storage has to be mounted on this node.
+        :param uri: Directory FILE URI.
+        :param mode: "r" to probe without writing, "w" otherwise.
+        :param ignore_failures: Probe again storage locations cached as unreachable.
+        :return: (storage location, duration), duration is None if the directory isn't usable.
+        """
+        path = urlparse(uri).path
+        access = os.R_OK | os.X_OK if mode == "r" else os.R_OK | os.X_OK | os.W_OK
+        if not os.path.isdir(path) or not os.access(path, access):
+            logging.debug("ProtocolSelector._probe_file: '" + path + "' isn't accessible from this node")
+            return (uri, None)
+
+        location = "file://" + self._mount_point(path)
+        hit, duration = self.__cached(location, mode, ignore_failures)
+        if hit:
+            return (location, duration)
+
+        start = time.monotonic()
+        try:
+            if mode == "r":
+                files = [n for n in os.listdir(path) if os.path.isfile(os.path.join(path, n))]
+                if len(files) > 0:
+                    with open(os.path.join(path, files[0]), "rb") as f:
+                        f.read(self.__probe_size)
+            else:
+                self.__probe_file_write(path)
+        except OSError as e:
+            logging.debug("ProtocolSelector._probe_file: unable to probe '" + path + "' : " + str(e))
+            return (location, None)
+
+        return (location, self.__store(location, mode, time.monotonic() - start))
+
+    def __probe_file_write(self, path: str):
+        """
+        Write and read a temporary probe file in path, the file is always removed.
+        """
+        probe_path = os.path.join(path, PROBE_FILE_PREFIX + uuid4().hex)
+        try:
+            with open(probe_path, "wb") as f:
+                f.write(os.urandom(self.__probe_size))
+                f.flush()
+                os.fsync(f.fileno())
+            with open(probe_path, "rb") as f:
+                f.read()
+        finally:
+            if os.path.exists(probe_path):
+                os.unlink(probe_path)
+
+    def _probe_ftp(self, uri: str, mode: str, ignore_failures=False):
+        """
+        Probe FTP protocol, latency is included as a new connexion is made.
+        :param uri: Directory FTP URI.
+        :param mode: "r" to probe without writing, "w" otherwise.
+        :param ignore_failures: Probe again storage locations cached as unreachable.
+        :return: (storage location, duration), duration is None if the server isn't reachable.
+        """
+        parsed_uri = urlparse(uri)
+        location = "ftp://" + str(parsed_uri.hostname) + ":" + str(parsed_uri.port)
+        hit, duration = self.__cached(location, mode, ignore_failures)
+        if hit:
+            return (location, duration)
+
+        start = time.monotonic()
+        try:
+            with ftputil.FTPHost(
+                    parsed_uri.hostname,
+                    parsed_uri.username,
+                    parsed_uri.password,
+                    port=parsed_uri.port,
+                    timeout=self.__probe_timeout,
+                    session_factory=FTPAnonSessionWithPort) as ftp_host:
+                ftp_host.chdir(parsed_uri.path)
+                if mode == "r":
+                    files = [n for n in ftp_host.listdir(ftp_host.curdir) if ftp_host.path.isfile(n)]
+                    if len(files) > 0:
+                        with ftp_host.open(files[0], "rb") as f:
+                            f.read(self.__probe_size)
+                else:
+                    self.__probe_ftp_write(ftp_host)
+        except (ftputil.error.FTPError, OSError, EOFError) as e:
+            logging.debug("ProtocolSelector._probe_ftp: '" + location + "' isn't reachable : " + str(e))
+            return (location, self.__store(location, mode, None))
+
+        return (location, self.__store(location, mode, time.monotonic() - start))
+
+    def __probe_ftp_write(self, ftp_host):
+        """
+        Upload and download a temporary probe file in the FTP current directory, the file is always removed.
+        """
+        probe_name = PROBE_FILE_PREFIX + uuid4().hex
+        try:
+            with ftp_host.open(probe_name, "wb") as f:
+                f.write(os.urandom(self.__probe_size))
+            with ftp_host.open(probe_name, "rb") as f:
+                f.read()
+        finally:
+            if ftp_host.path.exists(probe_name):
+                ftp_host.remove(probe_name)
+
+    def __select_fastest(self, uris, mode: str, ignore_failures=False):
+        """
+        Probe protocols and return the fastest one, None if none is usable.
+        :param uris: Dict protocol -> directory URI.
+        :param mode: Opening mode.
+        :param ignore_failures: Probe again storage locations cached as unreachable.
+        """
+        best_protocol, best_duration = None, None
+        for protocol, uri in uris.items():
+            location, duration = self.__probes[protocol](uri, mode, ignore_failures)
+            if duration is None:
+                continue
+
+            logging.debug("ProtocolSelector.select: " + location + " probe took " + str(duration) + "s")
+            if best_duration is None or duration < best_duration:
+                best_protocol, best_duration = protocol, duration
+
+        return best_protocol
+
+    def select(self, uuid: str, mode="w"):
+        """
+        Return the fastest protocol for a directory uuid.
+        :param uuid: Directory uuid.
+        :param mode: Opening mode, nothing is written in the directory with "r".
+        """
+        if len(self.__protocols) == 1:
+            return self.__protocols[0]
+
+        uris = {p: fetch_uri(self.__api_base, uuid, p) for p in self.__protocols if p in self.__probes}
+        self.__cached_failure_used = False
+        best_protocol = self.__select_fastest(uris, mode)
+        if best_protocol is None and self.__cached_failure_used:  # cached failures may be outdated, nothing else is usable
+            best_protocol = self.__select_fastest(uris, mode, ignore_failures=True)
+
+        if self.__cache_changed:
+            self.__save_cache()
+            self.__cache_changed = False
+
+        if best_protocol is None:
+            raise OPVDMCException("No protocol can reach directory " + uuid + " from this node")
+
+        logging.debug("ProtocolSelector.select: selected protocol " + str(best_protocol))
+        return best_protocol